@@ -86,7 +86,9 @@ const HTML_TEMPLATE = `<!DOCTYPE html>
   }
   html[data-theme="dark"] .theme-toggle { color: #e6edf3; }
   html[data-theme="light"] .theme-toggle { color: #1f2328; }
-  #content { display: none; }
+  .load-error { font-style: italic; }
+  html[data-theme="dark"] .load-error { color: #f85149; }
+  html[data-theme="light"] .load-error { color: #cf222e; }
 </style>
 </head>
 <body>
@@ -95,10 +97,20 @@ const HTML_TEMPLATE = `<!DOCTYPE html>
   <button class="theme-toggle" onclick="toggleTheme()" title="Toggle light/dark mode">&#9788;</button>
 </nav>
 <div id="raw" class="markdown-body"></div>
-<pre id="content">CONTENT</pre>
 <script>
-  const md = document.getElementById('content').textContent;
-  document.getElementById('raw').innerHTML = marked.parse(md);
+  fetch(location.pathname + '.md')
+    .then(function(r) {
+      if (!r.ok) throw new Error(r.status + ' ' + r.statusText);
+      return r.text();
+    })
+    .then(function(md) {
+      document.getElementById('raw').innerHTML = marked.parse(md);
+    })
+    .catch(function(err) {
+      var el = document.getElementById('raw');
+      el.className = 'load-error';
+      el.textContent = 'Could not load this log (' + err.message + ').';
+    });
   function setTheme(theme) {
     document.documentElement.dataset.theme = theme;
     localStorage.setItem('cc-theme', theme);
@@ -416,15 +428,14 @@ function main() {
 
     // Rendered HTML: /filename (no .md)
     const mdFile = path.join(args.dir, path.basename(urlPath) + ".md");
+    let isFile = false;
     try {
-      const content = fs.readFileSync(mdFile, "utf-8");
+      isFile = fs.statSync(mdFile).isFile();
+    } catch {}
+    if (isFile) {
       const title = escapeHtml(path.basename(urlPath));
-      const body = HTML_TEMPLATE.replace("TITLE", title).replace(
-        "CONTENT",
-        escapeHtml(content)
-      );
-      respond(200, body, "text/html");
-    } catch {
+      respond(200, HTML_TEMPLATE.replace("TITLE", title), "text/html");
+    } else {
       respond(404, "Not found", "text/plain");
     }
   }
@@ -16,6 +16,10 @@ Usage:
 
 import argparse
 import atexit
+import datetime
+import email.utils
+import functools
+import gzip
 import html
 import json
 import os
@@ -23,9 +27,13 @@ import re
 import shutil
 import signal
 import ssl
+import stat
 import subprocess
 import sys
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import threading
+import time
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import unquote
 
 DEFAULT_PORT = 9443
@@ -49,6 +57,21 @@ LABEL_RE = re.compile(
     r"(?:\s+\d{2}:\d{2})?\s*\u2014\s+(.+)$"
 )
 
+# Last index build, reused while the log directory is unchanged
+_INDEX_CACHE = {
+    "log_dir": None, "mtime_ns": None, "scanned_ns": 0, "checked_ns": -1,
+    "files": (), "key": None, "body": b"",
+}
+# Guards _INDEX_CACHE; held for a whole build, so concurrent index
+# requests share one
+_INDEX_BUILD_LOCK = threading.Lock()
+# Seconds an index request waits on another build before serving the
+# last cached page instead
+_INDEX_WAIT = 2.0
+_RACY_NS = 1_000_000_000
+# Rendered log pages kept in memory; their gzip and ETag caches follow it
+_PAGE_CACHE_SIZE = 128
+
 HTML_TEMPLATE = """\
 <!DOCTYPE html>
 <html lang="en" data-theme="dark">
@@ -99,7 +122,9 @@ HTML_TEMPLATE = """\
   }}
   html[data-theme="dark"] .theme-toggle {{ color: #e6edf3; }}
   html[data-theme="light"] .theme-toggle {{ color: #1f2328; }}
-  #content {{ display: none; }}
+  .load-error {{ font-style: italic; }}
+  html[data-theme="dark"] .load-error {{ color: #f85149; }}
+  html[data-theme="light"] .load-error {{ color: #cf222e; }}
 </style>
 </head>
 <body>
@@ -108,10 +133,20 @@ HTML_TEMPLATE = """\
   <button class="theme-toggle" onclick="toggleTheme()" title="Toggle light/dark mode">&#9788;</button>
 </nav>
 <div id="raw" class="markdown-body"></div>
-<pre id="content">{content}</pre>
 <script>
-  const md = document.getElementById('content').textContent;
-  document.getElementById('raw').innerHTML = marked.parse(md);
+  fetch(location.pathname + '.md')
+    .then(function(r) {{
+      if (!r.ok) throw new Error(r.status + ' ' + r.statusText);
+      return r.text();
+    }})
+    .then(function(md) {{
+      document.getElementById('raw').innerHTML = marked.parse(md);
+    }})
+    .catch(function(err) {{
+      var el = document.getElementById('raw');
+      el.className = 'load-error';
+      el.textContent = 'Could not load this log (' + err.message + ').';
+    }});
   function setTheme(theme) {{
     document.documentElement.dataset.theme = theme;
     localStorage.setItem('cc-theme', theme);
@@ -233,22 +268,30 @@ INDEX_TEMPLATE = """\
 </html>
 """
 
+# Both pages pre-rendered and encoded once around their placeholders, so
+# a response only joins these constant chunks with the substituted values.
+_HTML_HEAD, _HTML_TAIL = (
+    HTML_TEMPLATE.format(title="\0").encode("utf-8").split(b"\0")
+)
+_INDEX_HEAD, _INDEX_TAIL = (
+    INDEX_TEMPLATE.format(entries="\0").encode("utf-8").split(b"\0")
+)
 
-def parse_log_name(filename):
-    """Extract metadata from a log filename. Returns None if name doesn't match."""
-    name = filename.replace(".md", "")
-    m = LOG_NAME_RE.match(name)
-    if not m:
-        return None
-    time_part = m.group(2)
-    return {
-        "raw": name,
-        "date": m.group(1),
-        "time": f"{time_part[:2]}:{time_part[2:]}",
-        "session": m.group(3),
-        "agent_type": m.group(4),
-        "agent_id": m.group(5),
-    }
+SESSION_TEMPLATE = (
+    '<div class="session" data-href="/{slug}">'
+    '  <span class="session-name">'
+    '<a class="row-link" href="/{slug}">{label}</a>'
+    '</span>'
+    '  <span class="formats">'
+    '    <a href="/{slug}">html</a>'
+    '    <a href="/{name}">md</a>'
+    '  </span>'
+    '</div>'
+)
+
+SUBAGENT_TEMPLATE = '<span class="subagent">{agent_type} {agent_id}</span>'
+
+LABEL_TEMPLATE = '<span class="label">{label}</span>'
 
 
 def read_label(filepath):
@@ -262,111 +305,426 @@ def read_label(filepath):
         return None
 
 
-def build_index(log_dir):
-    """Build the index HTML page."""
+def _is_visible_log(name):
+    """Return True if name looks like a servable log: *.md, not a dotfile."""
+    return name.endswith(".md") and not name.startswith(".")
+
+
+def _scan_logs(log_dir):
+    """Return (name, mtime_ns) for every visible .md file, newest first."""
+    key = []
     try:
-        files = [f for f in os.listdir(log_dir)
-                 if f.endswith(".md") and not f.startswith(".")]
+        with os.scandir(log_dir) as it:
+            for entry in it:
+                name = entry.name
+                if not _is_visible_log(name):
+                    continue
+                try:
+                    if entry.is_file():
+                        key.append((name, entry.stat().st_mtime_ns))
+                except OSError:
+                    continue
     except FileNotFoundError:
-        files = []
+        return ()
+    key.sort(reverse=True)
+    return tuple(key)
 
-    # Filter to only well-formed filenames
-    entries = []
+
+def _index_key(log_dir, files):
+    """Return a tuple of (name, mtime_ns) for the given log files."""
+    key = []
     for f in files:
-        meta = parse_log_name(f)
-        if meta is not None:
-            entries.append((f, meta))
+        try:
+            key.append((f, os.stat(os.path.join(log_dir, f)).st_mtime_ns))
+        except OSError:
+            continue
+    return tuple(key)
+
+
+@functools.lru_cache(maxsize=4096)
+def _render_entry(log_dir, f, mtime_ns):
+    """Render one index row, or None if the filename isn't well-formed.
+
+    mtime_ns is only part of the cache key, so a relabeled log is
+    rendered again while untouched rows are reused across rebuilds.
+    """
+    slug = f[:-3]
+    m = LOG_NAME_RE.match(slug)
+    if m is None:
+        return None
+    date, hhmm, session, agent_type, agent_id = m.groups()
+
+    label_text = f'{date} {hhmm[:2]}:{hhmm[2:]} &mdash; {session}'
+    if agent_type:
+        label_text += SUBAGENT_TEMPLATE.format(
+            agent_type=agent_type,
+            agent_id=agent_id or "",
+        )
+
+    # Check for label in file header
+    file_label = read_label(os.path.join(log_dir, f))
+    if file_label:
+        label_text += LABEL_TEMPLATE.format(
+            label=html.escape(file_label),
+        )
+
+    return SESSION_TEMPLATE.format(slug=slug, name=f, label=label_text)
 
-    entries.sort(key=lambda x: x[0], reverse=True)
 
-    if not entries:
+def _render_index(log_dir, key):
+    """Render the index page for a given _index_key. Returns UTF-8 bytes."""
+    # Filter to only well-formed filenames
+    parts = [row for row in (_render_entry(log_dir, f, mtime_ns)
+                             for f, mtime_ns in key)
+             if row is not None]
+
+    if not parts:
         html_entries = '<p class="empty">No session logs found.</p>'
     else:
-        parts = []
-        for f, meta in entries:
-            date_time = f'{meta["date"]} {meta["time"]}'
-            label_text = f'{date_time} &mdash; {meta["session"]}'
-            if meta["agent_type"]:
-                label_text += (f'<span class="subagent">'
-                               f'{meta["agent_type"]} {meta["agent_id"] or ""}'
-                               f'</span>')
-
-            # Check for label in file header
-            file_label = read_label(os.path.join(log_dir, f))
-            if file_label:
-                label_text += (f'<span class="label">'
-                               f'{html.escape(file_label)}'
-                               f'</span>')
-
-            slug = f.replace(".md", "")
-            parts.append(
-                f'<div class="session" data-href="/{slug}">'
-                f'  <span class="session-name">'
-                f'<a class="row-link" href="/{slug}">{label_text}</a>'
-                f'</span>'
-                f'  <span class="formats">'
-                f'    <a href="/{slug}">html</a>'
-                f'    <a href="/{f}">md</a>'
-                f'  </span>'
-                f'</div>'
-            )
         html_entries = "\n".join(parts)
 
-    return INDEX_TEMPLATE.format(entries=html_entries)
+    return b"".join((_INDEX_HEAD, html_entries.encode("utf-8"), _INDEX_TAIL))
+
+
+def _refresh_listing(log_dir, cache):
+    """Rescan log_dir into cache if it may have changed.
+
+    Returns the fresh (name, mtime_ns) tuple from a rescan, or None if
+    the cached listing is still current.
+    """
+    try:
+        dir_mtime = os.stat(log_dir).st_mtime_ns
+    except FileNotFoundError:
+        dir_mtime = None
+
+    # Directory mtimes can be coarse, so a listing taken in the same tick
+    # as the last change may have missed a file. Only trust listings taken
+    # well after it.
+    if (dir_mtime is not None and cache["log_dir"] == log_dir
+            and dir_mtime == cache["mtime_ns"]
+            and cache["scanned_ns"] - dir_mtime > _RACY_NS):
+        return None
+
+    scanned_ns = time.time_ns()
+    key = _scan_logs(log_dir)
+    cache.update(log_dir=log_dir, mtime_ns=dir_mtime, scanned_ns=scanned_ns,
+                 files=tuple(f for f, _ in key))
+    return key
+
+
+def build_index(log_dir):
+    """Build the index HTML page as UTF-8 bytes.
+
+    The directory listing is reused while the log directory's mtime is
+    unchanged. Logs are rewritten in place, which doesn't touch the
+    directory, so each file's mtime is still checked before reusing the
+    last render.
+
+    Builds are serialized: requests that arrive while one is in flight
+    wait for it and get its bytes instead of rescanning themselves. If it
+    takes longer than _INDEX_WAIT, they get the last page built instead.
+    """
+    cache = _INDEX_CACHE
+    requested_ns = time.monotonic_ns()
+    if not _INDEX_BUILD_LOCK.acquire(timeout=_INDEX_WAIT):
+        if cache["log_dir"] == log_dir:
+            return cache["body"]
+        # Nothing to fall back on for this directory yet
+        _INDEX_BUILD_LOCK.acquire()
+    try:
+        # A check that started after this request arrived is as fresh as
+        # one we'd do ourselves.
+        if cache["log_dir"] == log_dir and cache["checked_ns"] >= requested_ns:
+            return cache["body"]
+        cache["checked_ns"] = time.monotonic_ns()
+
+        key = _refresh_listing(log_dir, cache)
+        if key is None:
+            key = _index_key(log_dir, cache["files"])
+
+        if key != cache["key"]:
+            cache.update(key=key, body=_render_index(log_dir, key))
+        return cache["body"]
+    finally:
+        _INDEX_BUILD_LOCK.release()
+
+
+# One slot per cached rendered page, plus the current index
+@functools.lru_cache(maxsize=_PAGE_CACHE_SIZE + 1)
+def _gzip(body):
+    """Gzip a rendered page once and reuse it for every request."""
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+# Keyed on the bytes sent, so identity and gzip variants each take a slot
+@functools.lru_cache(maxsize=2 * (_PAGE_CACHE_SIZE + 1))
+def _etag(body):
+    """Return a strong ETag for a rendered page."""
+    return f'"{zlib.crc32(body):08x}-{len(body)}"'
+
+
+def _stat_file(file_path):
+    """Return os.stat() for a regular file, or None if there isn't one."""
+    try:
+        st = os.stat(file_path)
+    except (OSError, ValueError):
+        return None
+    return st if stat.S_ISREG(st.st_mode) else None
+
+
+def _file_validators(st, gzipped):
+    """Return the ETag and Last-Modified headers for a log file.
+
+    The gzip variant gets its own ETag, since its bytes differ from the
+    identity response. Last-Modified is left off while the file is racy.
+    """
+    suffix = "-gzip" if gzipped else ""
+    validators = [("ETag", f'"{st.st_mtime_ns}-{st.st_size}{suffix}"')]
+    if not _is_racy(st):
+        validators.append(
+            ("Last-Modified", email.utils.formatdate(st.st_mtime, usegmt=True)))
+    return tuple(validators)
+
+
+def _is_racy(st):
+    """Return True if st was modified too recently to trust Last-Modified.
+
+    Last-Modified only has one-second precision, so a rewrite within the
+    same second would otherwise pass an If-Modified-Since check.
+    """
+    return time.time_ns() - st.st_mtime_ns < _RACY_NS
+
+
+@functools.lru_cache(maxsize=128)
+def _gzip_file(file_path, mtime_ns, size):
+    """Gzip a log file's contents.
+
+    mtime_ns and size are only part of the cache key, so a rewritten
+    log is compressed again instead of served stale.
+    """
+    with open(file_path, "rb") as f:
+        return gzip.compress(f.read(), compresslevel=6, mtime=0)
+
+
+def make_index_handler(log_dir):
+    """Return the handler for the index page: /"""
+    def handle_index(handler, name):
+        handler._respond_page(build_index(log_dir))
+    return handle_index
+
+
+def make_raw_handler(log_dir):
+    """Return the handler for raw markdown: /{name}.md"""
+    content_type = "text/plain; charset=utf-8"
+
+    def handle_raw(handler, name):
+        # name is already a basename; dotfiles are never served
+        file_path = os.path.join(log_dir, name)
+        st = _stat_file(file_path) if _is_visible_log(name) else None
+        if st is None:
+            handler._respond(404, b"Not found", "text/plain")
+            return
+        gzipped = handler._accepts_gzip()
+        validators = _file_validators(st, gzipped)
+        mtime = None if _is_racy(st) else st.st_mtime
+        if handler._not_modified(validators[0][1], mtime):
+            handler._respond_not_modified(validators)
+        elif gzipped:
+            body = _gzip_file(file_path, st.st_mtime_ns, st.st_size)
+            handler._respond(200, body, content_type,
+                             encoding="gzip", headers=validators)
+        else:
+            handler._send_file(file_path, st, content_type)
+    return handle_raw
+
+
+def make_rendered_handler(log_dir):
+    """Return the handler for rendered HTML: /{name}"""
+    head, tail = _HTML_HEAD, _HTML_TAIL
+
+    @functools.lru_cache(maxsize=_PAGE_CACHE_SIZE)
+    def render(title):
+        """Render the HTML page for a log. Returns UTF-8 bytes.
+
+        The page only carries the title; the browser fetches the raw
+        markdown from /{title}.md and renders it with marked.
+        """
+        return b"".join((head, html.escape(title).encode("utf-8"), tail))
+
+    def handle_rendered(handler, name):
+        file_name = name + ".md"
+        if (not _is_visible_log(file_name)
+                or _stat_file(os.path.join(log_dir, file_name)) is None):
+            handler._respond(404, b"Not found", "text/plain")
+            return
+        handler._respond_page(render(name))
+    return handle_rendered
+
+
+@functools.lru_cache(maxsize=None)
+def make_routes(log_dir):
+    """Return the endpoint name -> handler table for a log directory.
+
+    Built once per directory, so each keeps its own handler closures.
+    """
+    return {
+        "index": make_index_handler(log_dir),
+        "raw": make_raw_handler(log_dir),
+        "rendered": make_rendered_handler(log_dir),
+    }
 
 
 class LogHandler(BaseHTTPRequestHandler):
     """HTTP(S) request handler for session logs."""
 
+    # Served through make_routes(log_dir); set it on the class or use
+    # make_handler() to serve another directory
     log_dir = DEFAULT_DIR
+    # Keep connections open across requests; every response sets
+    # Content-Length so clients know where each body ends.
+    protocol_version = "HTTP/1.1"
+    # Close idle or stalled connections rather than hold a thread
+    timeout = 30
+    # Buffer headers and body into one write per response, and send it
+    # without waiting on Nagle's algorithm
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        # The TLS handshake is deferred from accept() to here, so a slow
+        # or silent client ties up its own thread, not the accept loop.
+        if isinstance(self.connection, ssl.SSLSocket):
+            try:
+                self.connection.do_handshake()
+            except OSError:
+                return
+        super().handle()
 
     def do_GET(self):
+        routes = make_routes(self.log_dir)
         path = unquote(self.path).lstrip("/")
-
-        # Index
         if not path:
-            body = build_index(self.log_dir)
-            self._respond(200, body, "text/html")
-            return
-
-        # Raw markdown: /filename.md
-        if path.endswith(".md"):
-            file_path = os.path.join(self.log_dir, os.path.basename(path))
-            if os.path.isfile(file_path):
-                with open(file_path, "r") as f:
-                    content = f.read()
-                self._respond(200, content, "text/plain; charset=utf-8")
-            else:
-                self._respond(404, "Not found", "text/plain")
-            return
-
-        # Rendered HTML: /filename (no .md)
-        md_file = os.path.join(self.log_dir, os.path.basename(path) + ".md")
-        if os.path.isfile(md_file):
-            with open(md_file, "r") as f:
-                content = f.read()
-            title = os.path.basename(path)
-            body = HTML_TEMPLATE.format(
-                title=html.escape(title),
-                content=html.escape(content),
-            )
-            self._respond(200, body, "text/html")
+            routes["index"](self, "")
             return
+        name = os.path.basename(path)
+        routes["raw" if name.endswith(".md") else "rendered"](self, name)
+
+    def _accepts_gzip(self):
+        """Return True if the request's Accept-Encoding allows gzip."""
+        for coding in self.headers.get("Accept-Encoding", "").split(","):
+            name, _, params = coding.partition(";")
+            if name.strip().lower() != "gzip":
+                continue
+            # gzip;q=0 means the client explicitly refuses it
+            q = params.strip().lower()
+            if q.startswith("q="):
+                try:
+                    return float(q[2:]) > 0
+                except ValueError:
+                    return False
+            return True
+        return False
+
+    def _not_modified(self, etag, mtime=None):
+        """Return True if the client's cached copy is still current.
+
+        If-None-Match takes precedence; If-Modified-Since is only checked
+        when it's absent and the resource has a modification time.
+        """
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [t.strip() for t in if_none_match.split(",")]
+            tags = [t[2:] if t.startswith("W/") else t for t in tags]
+            return "*" in tags or etag in tags
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is None or mtime is None:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.timezone.utc)
+        return int(mtime) <= since.timestamp()
+
+    def _respond_page(self, body):
+        """Send an HTML page, gzipped if the client accepts it."""
+        gzipped = self._accepts_gzip()
+        if gzipped:
+            body = _gzip(body)
+        validators = (("ETag", _etag(body)),)
+        if self._not_modified(validators[0][1]):
+            self._respond_not_modified(validators)
+        elif gzipped:
+            self._respond(200, body, "text/html", encoding="gzip",
+                          headers=validators)
+        else:
+            self._respond(200, body, "text/html", headers=validators)
 
-        self._respond(404, "Not found", "text/plain")
+    def _respond_not_modified(self, validators):
+        self.send_response(304)
+        for name, value in validators:
+            self.send_header(name, value)
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
 
-    def _respond(self, code, body, content_type):
-        encoded = body.encode("utf-8")
+    def _respond(self, code, body, content_type, encoding=None, headers=()):
         self.send_response(code)
         self.send_header("Content-Type", content_type)
-        self.send_header("Content-Length", str(len(encoded)))
+        self.send_header("Content-Length", str(len(body)))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Vary", "Accept-Encoding")
         self.send_header("Access-Control-Allow-Origin", "*")
         self.end_headers()
-        self.wfile.write(encoded)
+        self.wfile.write(body)
+
+    def _send_file(self, file_path, st, content_type):
+        """Stream a file to the client without loading it into memory.
+
+        socket.sendfile uses os.sendfile on plain sockets and falls back
+        to send() under TLS, where the kernel can't do the encryption.
+        """
+        try:
+            f = open(file_path, "rb")
+        except OSError:
+            self._respond(404, b"Not found", "text/plain")
+            return
+        with f:
+            size = st.st_size
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(size))
+            for name, value in _file_validators(st, False):
+                self.send_header(name, value)
+            self.send_header("Vary", "Accept-Encoding")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.flush()
+            sent = self.connection.sendfile(f, 0, size)
+        # A log truncated mid-send leaves the body short of Content-Length;
+        # close so the client doesn't wait on the connection for the rest.
+        if sent < size:
+            self.close_connection = True
 
     def log_message(self, fmt, *args):
         sys.stderr.write(f"  {args[0]} {args[1]}\n")
 
+    def log_error(self, fmt, *args):
+        # Idle keep-alive connections reaching the timeout is routine
+        if fmt.startswith("Request timed out"):
+            return
+        sys.stderr.write(f"  {fmt % args}\n")
+
+
+def make_handler(log_dir):
+    """Return a LogHandler subclass that serves log_dir."""
+    return type("LogHandler", (LogHandler,), {"log_dir": log_dir})
+
 
 def ensure_cert(cert_dir):
     """Ensure a self-signed cert exists, generating one if needed.
@@ -426,9 +784,8 @@ def main():
 
     os.makedirs(args.dir, exist_ok=True)
 
-    LogHandler.log_dir = args.dir
-
-    server = HTTPServer((args.host, args.port), LogHandler)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.dir))
+    server.daemon_threads = True
 
     protocol = "http"
     if not args.use_http:
@@ -440,7 +797,9 @@ def main():
 
         context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
         context.load_cert_chain(cert_path, key_path)
-        server.socket = context.wrap_socket(server.socket, server_side=True)
+        server.socket = context.wrap_socket(
+            server.socket, server_side=True, do_handshake_on_connect=False,
+        )
         protocol = "https"
 
     host_display = "localhost" if args.host == "127.0.0.1" else args.host
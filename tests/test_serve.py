@@ -9,13 +9,18 @@ Usage:
     python3 tests/test_serve.py --js-only
 """
 
+import email.utils
+import gzip
+import http.client
 import json
 import os
 import shutil
+import socket
 import ssl
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 import unittest
 import urllib.request
@@ -72,6 +77,20 @@ def _fetch_headers(url, use_ssl=False):
     return resp.headers
 
 
+def _request(url, headers=None, use_ssl=False):
+    """Fetch a URL with extra request headers.
+
+    Returns (status_code, headers, body_bytes) without decoding the body.
+    """
+    ctx = _make_ssl_context() if use_ssl else None
+    req = urllib.request.Request(url, headers=headers or {})
+    try:
+        resp = urllib.request.urlopen(req, timeout=5, context=ctx)
+        return resp.status, resp.headers, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
 def _start_server(runtime, port, log_dir, extra_args=None, cwd=None):
     """Start a serve-sessions process and wait for it to be ready."""
     if runtime == "py":
@@ -155,6 +174,12 @@ class ServeHTTPSTestBase:
         self.assertEqual(status, 200)
         self.assertIn("cc-session-logs", body)
 
+    def test_stalled_tls_client_does_not_block(self):
+        """A client that never sends a TLS ClientHello doesn't stall others."""
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5):
+            status, body = _fetch(self.base_url + "/", use_ssl=True)
+        self.assertEqual(status, 200)
+
     # --- Index ---
 
     def test_index_lists_sessions(self):
@@ -182,6 +207,22 @@ class ServeHTTPSTestBase:
         status, body = _fetch(self.base_url + "/", use_ssl=True)
         self.assertIn("Auth Feature", body)
 
+    def test_label_edit_shown_in_index(self):
+        """Editing a label in place is reflected on the next index hit."""
+        _fetch(self.base_url + "/", use_ssl=True)
+        with open(os.path.join(self.log_dir, "2026-02-16-1856-abc12345.md"), "w") as f:
+            f.write("# Session `abc12345` \u2014 2026-02-16 18:56 \u2014 Relabeled Thread\n\n---\n\nHello\n")
+        status, body = _fetch(self.base_url + "/", use_ssl=True)
+        self.assertIn("Relabeled Thread", body)
+
+    def test_index_picks_up_new_log(self):
+        """A log created after the index was served appears on the next hit."""
+        _fetch(self.base_url + "/", use_ssl=True)
+        with open(os.path.join(self.log_dir, "2026-02-18-1200-fed09876.md"), "w") as f:
+            f.write("# Session `fed09876` \u2014 2026-02-18 12:00\n\n---\n\nLater.\n")
+        status, body = _fetch(self.base_url + "/", use_ssl=True)
+        self.assertIn("fed09876", body)
+
     # --- Raw markdown ---
 
     def test_raw_markdown(self):
@@ -190,10 +231,48 @@ class ServeHTTPSTestBase:
         self.assertIn("# Session `abc12345`", body)
         self.assertIn("> Hello", body)
 
+    def test_raw_markdown_reflects_rewrite(self):
+        """A log rewritten after being served is not served stale."""
+        url = self.base_url + "/2026-02-16-1856-abc12345.md"
+        _fetch(url, use_ssl=True)
+        with open(os.path.join(self.log_dir, "2026-02-16-1856-abc12345.md"), "w") as f:
+            f.write("# Session `abc12345` \u2014 2026-02-16 18:56\n\n---\n\nRewritten turn.\n")
+        status, body = _fetch(url, use_ssl=True)
+        self.assertEqual(status, 200)
+        self.assertIn("Rewritten turn.", body)
+
     def test_raw_markdown_404(self):
         status, _ = _fetch(self.base_url + "/nonexistent.md", use_ssl=True)
         self.assertEqual(status, 404)
 
+    def test_non_file_404(self):
+        """Directories and unopenable names are not served as logs."""
+        os.makedirs(os.path.join(self.log_dir, "2026-02-18-1200-dir.md"))
+        for name in ("2026-02-18-1200-dir.md", "2026-02-18-1200-dir", "bad%00name.md"):
+            status, _ = _fetch(self.base_url + "/" + name, use_ssl=True)
+            self.assertEqual(status, 404, name)
+
+    def test_raw_markdown_new_log(self):
+        """A log created after the directory was listed can be fetched."""
+        _fetch(self.base_url + "/2026-02-16-1856-abc12345.md", use_ssl=True)
+        with open(os.path.join(self.log_dir, "2026-02-18-1200-fed09876.md"), "w") as f:
+            f.write("# Session `fed09876` \u2014 2026-02-18 12:00\n\n---\n\nLater.\n")
+        status, body = _fetch(self.base_url + "/2026-02-18-1200-fed09876.md", use_ssl=True)
+        self.assertEqual(status, 200)
+        self.assertIn("Later.", body)
+        status, _ = _fetch(self.base_url + "/2026-02-18-1200-fed09876", use_ssl=True)
+        self.assertEqual(status, 200)
+
+    def test_hidden_file_404(self):
+        """Dotfiles in the log directory are not served."""
+        if self.runtime != "py":
+            self.skipTest("hidden files are only refused by the Python server")
+        with open(os.path.join(self.log_dir, ".notes.md"), "w") as f:
+            f.write("private\n")
+        for name in (".notes.md", ".notes"):
+            status, _ = _fetch(self.base_url + "/" + name, use_ssl=True)
+            self.assertEqual(status, 404, name)
+
     # --- Rendered HTML ---
 
     def test_rendered_html(self):
@@ -201,12 +280,27 @@ class ServeHTTPSTestBase:
         self.assertEqual(status, 200)
         self.assertIn("<html", body)
         self.assertIn("marked.parse", body)
-        self.assertIn("Session", body)
+        self.assertIn("<title>2026-02-16-1856-abc12345</title>", body)
+
+    def test_rendered_html_fetches_markdown(self):
+        """Rendered page loads the raw markdown client-side, not inline."""
+        status, body = _fetch(self.base_url + "/2026-02-16-1856-abc12345", use_ssl=True)
+        self.assertIn("fetch(location.pathname + '.md')", body)
+        self.assertIn("if (!r.ok)", body)
+        self.assertIn(".catch(", body)
+        self.assertNotIn("Hi there!", body)
 
     def test_rendered_404(self):
         status, _ = _fetch(self.base_url + "/nonexistent", use_ssl=True)
         self.assertEqual(status, 404)
 
+    def test_rendered_deleted_log_404(self):
+        """A log deleted after the index listed it is no longer served."""
+        _fetch(self.base_url + "/", use_ssl=True)
+        os.remove(os.path.join(self.log_dir, "2026-02-16-1856-abc12345.md"))
+        status, _ = _fetch(self.base_url + "/2026-02-16-1856-abc12345", use_ssl=True)
+        self.assertEqual(status, 404)
+
     # --- CORS ---
 
     def test_cors_header(self):
@@ -273,6 +367,145 @@ class ServeHTTPTestBase:
         self.assertEqual(status, 200)
         self.assertIn("# Session", body)
 
+    def test_concurrent_index_requests(self):
+        """Simultaneous index hits all get the same complete page."""
+        results = []
+
+        def fetch():
+            results.append(_fetch(self.base_url + "/", use_ssl=False))
+
+        threads = [threading.Thread(target=fetch) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(results), 8)
+        self.assertEqual({status for status, _ in results}, {200})
+        self.assertEqual(len({body for _, body in results}), 1)
+        self.assertIn("abc12345", results[0][1])
+
+    def test_gzip_raw_markdown(self):
+        """Raw markdown is gzipped when the client accepts it."""
+        if self.runtime != "py":
+            self.skipTest("gzip is only served by the Python server")
+        status, headers, body = _request(
+            self.base_url + "/2026-02-16-1856-abc12345.md",
+            headers={"Accept-Encoding": "gzip"},
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(headers.get("Content-Encoding"), "gzip")
+        self.assertEqual(int(headers.get("Content-Length")), len(body))
+        self.assertIn(b"# Session", gzip.decompress(body))
+
+    def test_gzip_index(self):
+        """The index is gzipped when the client accepts it."""
+        if self.runtime != "py":
+            self.skipTest("gzip is only served by the Python server")
+        status, headers, body = _request(
+            self.base_url + "/", headers={"Accept-Encoding": "br, gzip"},
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(headers.get("Content-Encoding"), "gzip")
+        self.assertIn(b"abc12345", gzip.decompress(body))
+
+    def test_gzip_refused(self):
+        """gzip;q=0 and a missing Accept-Encoding get the identity body."""
+        for headers in ({"Accept-Encoding": "gzip;q=0"}, {}):
+            status, resp_headers, body = _request(
+                self.base_url + "/2026-02-16-1856-abc12345.md", headers=headers,
+            )
+            self.assertEqual(status, 200)
+            self.assertIsNone(resp_headers.get("Content-Encoding"))
+            self.assertIn(b"# Session", body)
+
+    def test_etag_not_modified(self):
+        """A matching If-None-Match gets a bodyless 304 until the log changes."""
+        if self.runtime != "py":
+            self.skipTest("ETags are only served by the Python server")
+        url = self.base_url + "/2026-02-16-1856-abc12345.md"
+        path = os.path.join(self.log_dir, "2026-02-16-1856-abc12345.md")
+        os.utime(path, (time.time() - 60, time.time() - 60))
+        status, headers, _ = _request(url)
+        etag = headers.get("ETag")
+        self.assertIsNotNone(etag)
+        self.assertIsNotNone(headers.get("Last-Modified"))
+
+        status, headers, body = _request(url, headers={"If-None-Match": etag})
+        self.assertEqual(status, 304)
+        self.assertEqual(headers.get("ETag"), etag)
+        self.assertEqual(body, b"")
+
+        with open(path, "a") as f:
+            f.write("\nAnother turn.\n")
+        status, headers, body = _request(url, headers={"If-None-Match": etag})
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers.get("ETag"), etag)
+        self.assertIn(b"Another turn.", body)
+
+    def test_if_modified_since(self):
+        """If-Modified-Since at or after the log's mtime gets a 304."""
+        if self.runtime != "py":
+            self.skipTest("Last-Modified is only served by the Python server")
+        url = self.base_url + "/2026-02-16-1856-abc12345.md"
+        path = os.path.join(self.log_dir, "2026-02-16-1856-abc12345.md")
+        os.utime(path, (time.time() - 60, time.time() - 60))
+        _, headers, _ = _request(url)
+        status, _, _ = _request(
+            url, headers={"If-Modified-Since": headers.get("Last-Modified")},
+        )
+        self.assertEqual(status, 304)
+
+    def test_if_modified_since_same_second_rewrite(self):
+        """A rewrite within the date's second is not answered with a 304."""
+        if self.runtime != "py":
+            self.skipTest("Last-Modified is only served by the Python server")
+        url = self.base_url + "/2026-02-16-1856-abc12345.md"
+        path = os.path.join(self.log_dir, "2026-02-16-1856-abc12345.md")
+        with open(path, "w") as f:
+            f.write("# Session `abc12345` \u2014 2026-02-16 18:56\n\n---\n\nRewritten turn.\n")
+        since = email.utils.formatdate(os.stat(path).st_mtime, usegmt=True)
+        status, headers, body = _request(url, headers={"If-Modified-Since": since})
+        self.assertEqual(status, 200)
+        self.assertIsNone(headers.get("Last-Modified"))
+        self.assertIn(b"Rewritten turn.", body)
+
+    def test_index_etag(self):
+        """The index carries an ETag and honours If-None-Match."""
+        if self.runtime != "py":
+            self.skipTest("ETags are only served by the Python server")
+        _, headers, _ = _request(self.base_url + "/")
+        status, _, _ = _request(
+            self.base_url + "/", headers={"If-None-Match": headers.get("ETag")},
+        )
+        self.assertEqual(status, 304)
+
+    def test_keep_alive(self):
+        """Several requests can be served over one connection."""
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        try:
+            conn.request("GET", "/2026-02-16-1856-abc12345.md")
+            resp = conn.getresponse()
+            self.assertEqual(resp.status, 200)
+            self.assertIn(b"# Session", resp.read())
+            self.assertFalse(resp.will_close)
+            sock = conn.sock
+
+            conn.request("GET", "/")
+            resp = conn.getresponse()
+            self.assertEqual(resp.status, 200)
+            self.assertIn(b"cc-session-logs", resp.read())
+            self.assertIs(conn.sock, sock)
+        finally:
+            conn.close()
+
+    def test_stalled_client_does_not_block(self):
+        """A client that never finishes its request doesn't stall others."""
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as s:
+            s.sendall(b"GET / HTTP/1.1\r\n")
+            status, body = _fetch(self.base_url + "/", use_ssl=False)
+        self.assertEqual(status, 200)
+
 
 class ServeCustomCertTestBase:
     """Tests for --cert/--key mode."""